@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -29,6 +30,10 @@ def init_database():
 db = init_database()
 config = Config()
 
+# Styling lookups shared by every page
+RISK_LEVEL_COLORS = {'HIGH': '#d62728', 'MEDIUM': '#ff7f0e', 'LOW': '#2ca02c'}
+METRIC_STATUS_CLASSES = {'OK': 'low-risk', 'WARNING': 'medium-risk', 'CRITICAL': 'high-risk'}
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -44,6 +49,7 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=config.POLLING_INTERVAL_SECONDS)
 def load_analyst_cases():
     """Load analyst cases from database"""
     try:
@@ -60,6 +66,7 @@ def load_analyst_cases():
         st.error(f"Error loading analyst cases: {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=config.POLLING_INTERVAL_SECONDS)
 def load_risk_metrics():
     """Load risk metrics from database"""
     try:
@@ -75,6 +82,7 @@ def load_risk_metrics():
         st.error(f"Error loading risk metrics: {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=config.POLLING_INTERVAL_SECONDS)
 def load_transaction_history():
     """Load recent transaction history"""
     try:
@@ -86,7 +94,7 @@ def load_transaction_history():
         ORDER BY timestamp DESC
         LIMIT 1000
         """
-        return pd.read_sql(query, db.engine)
+        return pd.read_sql(query, db.engine, parse_dates=db.PARSE_DATES)
     except Exception as e:
         st.error(f"Error loading transaction history: {e}")
         return pd.DataFrame()
@@ -103,6 +111,8 @@ def update_case_status(case_id, new_status, comment):
         """, (new_status, comment, datetime.now(), case_id))
         conn.commit()
         conn.close()
+        # Drop cached cases so the change shows on the next rerun
+        load_analyst_cases.clear()
         return True
     except Exception as e:
         st.error(f"Error updating case: {e}")
@@ -124,6 +134,10 @@ if page == "Dashboard Overview":
     metrics_df = load_risk_metrics()
     transactions_df = load_transaction_history()
     
+    # Per-level and per-status case counts, shared by the metrics and charts
+    risk_counts = cases_df['risk_level'].value_counts() if not cases_df.empty else pd.Series(dtype='int64')
+    status_counts = cases_df['status'].value_counts() if not cases_df.empty else pd.Series(dtype='int64')
+    
     # Key metrics row
     col1, col2, col3, col4 = st.columns(4)
     
@@ -132,11 +146,11 @@ if page == "Dashboard Overview":
         st.metric("Total Cases", total_cases)
     
     with col2:
-        high_risk_cases = len(cases_df[cases_df['risk_level'] == 'HIGH'])
+        high_risk_cases = int(risk_counts.get('HIGH', 0))
         st.metric("High Risk Cases", high_risk_cases, delta=f"{high_risk_cases/max(total_cases,1)*100:.1f}%")
     
     with col3:
-        pending_cases = len(cases_df[cases_df['status'] == 'ASSIGNED'])
+        pending_cases = int(status_counts.get('ASSIGNED', 0))
         st.metric("Pending Review", pending_cases)
     
     with col4:
@@ -149,19 +163,17 @@ if page == "Dashboard Overview":
     with col1:
         if not cases_df.empty:
             # Risk level distribution
-            risk_counts = cases_df['risk_level'].value_counts()
             fig_risk = px.pie(
                 values=risk_counts.values, 
                 names=risk_counts.index,
                 title="Risk Level Distribution",
-                color_discrete_map={'HIGH': '#d62728', 'MEDIUM': '#ff7f0e', 'LOW': '#2ca02c'}
+                color_discrete_map=RISK_LEVEL_COLORS
             )
             st.plotly_chart(fig_risk, use_container_width=True)
     
     with col2:
         if not cases_df.empty:
             # Case status distribution
-            status_counts = cases_df['status'].value_counts()
             fig_status = px.bar(
                 x=status_counts.index, 
                 y=status_counts.values,
@@ -202,8 +214,8 @@ elif page == "Analyst Workbench":
         with col3:
             sort_by = st.selectbox("Sort by", ["Created Date", "Risk Score", "Amount"])
         
-        # Apply filters
-        filtered_cases = cases_df.copy()
+        # Apply filters (boolean indexing and sort_values already return new frames)
+        filtered_cases = cases_df
         if status_filter != "All":
             filtered_cases = filtered_cases[filtered_cases['status'] == status_filter]
         if risk_filter != "All":
@@ -287,11 +299,7 @@ elif page == "Risk Register":
             
             # Display metrics as cards
             for _, metric in category_metrics.iterrows():
-                status_color = {
-                    'OK': 'low-risk',
-                    'WARNING': 'medium-risk', 
-                    'CRITICAL': 'high-risk'
-                }.get(metric['status'], 'low-risk')
+                status_color = METRIC_STATUS_CLASSES.get(metric['status'], 'low-risk')
                 
                 st.markdown(f"""
                 <div class="metric-card {status_color}">
@@ -340,13 +348,14 @@ elif page == "Transaction Monitor":
             st.metric("Average Amount", f"KES {avg_amount:,.0f}")
         
         with col4:
-            blocked_txns = len(transactions_df[transactions_df['status'] == 'BLOCKED'])
+            blocked_txns = int((transactions_df['status'] == 'BLOCKED').sum())
             st.metric("Blocked Transactions", blocked_txns)
         
         # Transaction volume over time
         if 'timestamp' in transactions_df.columns:
-            transactions_df['hour'] = pd.to_datetime(transactions_df['timestamp']).dt.hour
-            hourly_volume = transactions_df.groupby('hour')['amount'].sum().reset_index()
+            # load_transaction_history already parses the timestamps
+            hour = transactions_df['timestamp'].dt.hour.rename('hour')
+            hourly_volume = transactions_df.groupby(hour)['amount'].sum().reset_index()
             
             fig_volume = px.line(
                 hourly_volume, 
@@ -374,15 +383,20 @@ elif page == "Deep Dive Analytics":
     transactions_df = load_transaction_history()
     
     if not cases_df.empty and not transactions_df.empty:
-        # Risk score distribution
-        fig_risk_dist = px.histogram(
-            cases_df, 
-            x='risk_score', 
-            nbins=20,
-            title="Risk Score Distribution",
-            labels={'risk_score': 'Risk Score', 'count': 'Number of Cases'}
-        )
-        st.plotly_chart(fig_risk_dist, use_container_width=True)
+        # Risk score distribution, binned here so only the 20 bar heights
+        # are sent to the browser rather than every case's score. Cases
+        # without a score are left out, as px.histogram did.
+        risk_scores = cases_df['risk_score'].dropna().to_numpy(dtype=np.float32)
+        if len(risk_scores) > 0:
+            counts, edges = np.histogram(risk_scores, bins=20)
+            fig_risk_dist = px.bar(
+                x=edges[:-1],
+                y=counts,
+                title="Risk Score Distribution",
+                labels={'x': 'Risk Score', 'y': 'Number of Cases'}
+            )
+            fig_risk_dist.update_traces(width=np.diff(edges), offset=0)
+            st.plotly_chart(fig_risk_dist, use_container_width=True)
         
         # Amount vs Risk Score scatter
         fig_scatter = px.scatter(
@@ -392,7 +406,7 @@ elif page == "Deep Dive Analytics":
             color='risk_level',
             title="Transaction Amount vs Risk Score",
             labels={'amount': 'Amount (KES)', 'risk_score': 'Risk Score'},
-            color_discrete_map={'HIGH': '#d62728', 'MEDIUM': '#ff7f0e', 'LOW': '#2ca02c'}
+            color_discrete_map=RISK_LEVEL_COLORS
         )
         st.plotly_chart(fig_scatter, use_container_width=True)
         
@@ -403,17 +417,19 @@ elif page == "Deep Dive Analytics":
                 'case_id': 'count'
             }).reset_index()
             merchant_risk.columns = ['merchant_name', 'avg_risk_score', 'case_count']
+            # All-NULL scores average to an object column, which nlargest rejects
+            merchant_risk['avg_risk_score'] = merchant_risk['avg_risk_score'].astype(float)
             merchant_risk = merchant_risk[merchant_risk['case_count'] >= 2]  # Only merchants with 2+ cases
             
             if not merchant_risk.empty:
                 fig_merchant = px.bar(
-                    merchant_risk.sort_values('avg_risk_score', ascending=False).head(10),
+                    merchant_risk.nlargest(10, 'avg_risk_score'),
                     x='merchant_name',
                     y='avg_risk_score',
                     title="Average Risk Score by Merchant (Top 10)",
                     labels={'merchant_name': 'Merchant', 'avg_risk_score': 'Average Risk Score'}
                 )
-                fig_merchant.update_xaxis(tickangle=45)
+                fig_merchant.update_layout(xaxis_tickangle=45)
                 st.plotly_chart(fig_merchant, use_container_width=True)
     else:
         st.info("Insufficient data for deep dive analytics")
@@ -26,6 +26,10 @@ class Config:
     # Monitoring Settings
     POLLING_INTERVAL_SECONDS = int(os.getenv('POLLING_INTERVAL_SECONDS', 30))
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', 100))
+    TAZAMA_WORKERS = max(1, int(os.getenv('TAZAMA_WORKERS', 8)))  # A thread pool needs at least one worker
+    
+    # Model Settings (set MODEL_CACHE_DIR empty to always retrain)
+    MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', 'model_cache')
     
     @property
     def database_url(self):
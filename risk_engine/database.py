@@ -7,6 +7,13 @@ import logging
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
+    # Parse timestamps once when reading so downstream code gets datetime64
+    # columns instead of re-parsing strings per row. SQLite stores both
+    # 'YYYY-MM-DD HH:MM:SS' and microsecond forms, hence ISO8601. The string
+    # form makes read_sql coerce malformed values to NaT instead of failing
+    # the whole query over one bad row.
+    PARSE_DATES = {'timestamp': 'ISO8601'}
+    
     def __init__(self):
         self.config = Config()
         self.engine = create_engine(self.config.database_url)
@@ -140,7 +147,7 @@ class DatabaseManager:
             query += f" LIMIT {limit}"
         
         try:
-            df = pd.read_sql(query, self.engine)
+            df = pd.read_sql(query, self.engine, parse_dates=self.PARSE_DATES)
             logger.info(f"Fetched {len(df)} pending transactions")
             return df
         except Exception as e:
@@ -149,53 +156,46 @@ class DatabaseManager:
     
     def create_analyst_case(self, transaction_data, risk_score, risk_level, flagged_reason):
         """Create a new case for analyst review"""
-        conn = self.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO analyst_cases 
-                (transaction_id, customer_id, amount, currency, merchant_name, 
-                 transaction_type, risk_score, risk_level, flagged_reason, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'ASSIGNED')
-            """, (
-                transaction_data['transaction_id'],
-                transaction_data['customer_id'],
-                transaction_data['amount'],
-                transaction_data.get('currency', 'KES'),
-                transaction_data.get('merchant_name', ''),
-                transaction_data.get('transaction_type', ''),
-                risk_score,
-                risk_level,
-                flagged_reason
-            ))
-            case_id = cur.lastrowid
-            conn.commit()
+            # Writes borrow a pooled connection from the engine instead of
+            # opening a fresh sqlite3 connection per call; begin() commits on
+            # success and rolls back on error.
+            with self.engine.begin() as conn:
+                result = conn.exec_driver_sql("""
+                    INSERT INTO analyst_cases 
+                    (transaction_id, customer_id, amount, currency, merchant_name, 
+                     transaction_type, risk_score, risk_level, flagged_reason, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'ASSIGNED')
+                """, (
+                    transaction_data['transaction_id'],
+                    transaction_data['customer_id'],
+                    transaction_data['amount'],
+                    transaction_data.get('currency', 'KES'),
+                    transaction_data.get('merchant_name', ''),
+                    transaction_data.get('transaction_type', ''),
+                    risk_score,
+                    risk_level,
+                    flagged_reason
+                ))
+                case_id = result.lastrowid
             logger.info(f"Created analyst case {case_id} for transaction {transaction_data['transaction_id']}")
             return case_id
         except Exception as e:
             logger.error(f"Error creating analyst case: {e}")
-            conn.rollback()
             return None
-        finally:
-            conn.close()
     
     def update_transaction_status(self, transaction_id, status):
         """Update transaction status (APPROVED, REJECTED, BLOCKED)"""
-        conn = self.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute("""
-                UPDATE transaction_history 
-                SET status = ? 
-                WHERE transaction_id = ?
-            """, (status, transaction_id))
-            conn.commit()
-            logger.info(f"Updated transaction {transaction_id} status to {status}")
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql("""
+                    UPDATE transaction_history 
+                    SET status = ? 
+                    WHERE transaction_id = ?
+                """, (status, transaction_id))
+            logger.debug(f"Updated transaction {transaction_id} status to {status}")
         except Exception as e:
             logger.error(f"Error updating transaction status: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
     
     def get_portfolio_metrics(self):
         """Calculate portfolio-level risk metrics"""
@@ -205,30 +205,27 @@ class DatabaseManager:
             SELECT 
                 COUNT(*) as total_transactions,
                 AVG(amount) as avg_amount,
-                SUM(CASE WHEN amount > 10000000 THEN 1 ELSE 0 END) as high_value_count,
+                COALESCE(SUM(CASE WHEN amount > 10000000 THEN 1 ELSE 0 END), 0) as high_value_count,
                 COUNT(DISTINCT customer_id) as unique_customers
             FROM transaction_history 
             WHERE datetime(timestamp) >= datetime('now', '-1 day')
             """
-            df = pd.read_sql(query, self.engine)
-            return df.iloc[0].to_dict()
+            # A single aggregate row: read it as a mapping rather than
+            # building a DataFrame only to convert it back to a dict
+            with self.engine.connect() as conn:
+                return dict(conn.execute(text(query)).mappings().one())
         except Exception as e:
             logger.error(f"Error calculating portfolio metrics: {e}")
             return {}
     
     def log_risk_metric(self, metric_type, metric_name, value, threshold, status):
         """Log a risk metric to the database"""
-        conn = self.get_connection()
         try:
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO risk_metrics 
-                (metric_type, metric_name, metric_value, threshold_value, status)
-                VALUES (?, ?, ?, ?, ?)
-            """, (metric_type, metric_name, value, threshold, status))
-            conn.commit()
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql("""
+                    INSERT INTO risk_metrics 
+                    (metric_type, metric_name, metric_value, threshold_value, status)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (metric_type, metric_name, value, threshold, status))
         except Exception as e:
-            logger.error(f"Error logging risk metric: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
\ No newline at end of file
+            logger.error(f"Error logging risk metric: {e}")
\ No newline at end of file
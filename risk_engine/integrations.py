@@ -166,7 +166,7 @@ class TazamaIntegration:
             }
             
             # Simulate Tazama response
-            logger.info(f"[SIMULATED] Submitted transaction to Tazama: {transaction_data['transaction_id']}")
+            logger.debug(f"[SIMULATED] Submitted transaction to Tazama: {transaction_data['transaction_id']}")
             
             # Simulate fraud score based on amount
             fraud_score = min(float(transaction_data['amount']) / 10000000, 1.0)
@@ -1,5 +1,8 @@
+import os
 import pandas as pd
 import numpy as np
+import joblib
+import sklearn
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import logging
@@ -7,60 +10,40 @@ import logging
 logger = logging.getLogger(__name__)
 
 class RiskScorer:
-    def __init__(self):
-        self.isolation_forest = IsolationForest(contamination=0.1, random_state=42)
+    # Lookup tables used on every call, built once at class definition
+    HIGH_RISK_MERCHANT_KEYWORDS = ('unknown', 'shell', 'suspicious', 'cash')
+    HIGH_RISK_LOCATIONS = frozenset({'unknown', 'offshore', 'foreign'})
+    LARGE_TRANSFER_TYPES = frozenset({'transfer', 'payment'})
+    TX_TYPE_CODES = {'transfer': 1, 'payment': 2, 'withdrawal': 3, 'deposit': 4}
+    CHANNEL_CODES = {'mobile': 1, 'online': 2, 'atm': 3, 'branch': 4}
+    
+    # Newest cached anomaly models kept on disk; enough for a few engines
+    # sharing one cache directory
+    MODEL_CACHE_KEEP = 3
+    
+    def __init__(self, model_cache_dir=None):
+        # Trees are independent, so fit them on all cores. 'auto' bounds each
+        # tree to min(256, n_samples) rows.
+        self.isolation_forest = IsolationForest(
+            contamination=0.1, max_samples='auto', n_jobs=-1, random_state=42
+        )
         self.scaler = StandardScaler()
         self.is_trained = False
+        
+        # Fitted models are saved here, keyed by a hash of their training
+        # features, so a restart on the same data loads instead of refitting
+        self.model_cache_dir = model_cache_dir
+        self.training_fingerprint = None
     
     def calculate_transaction_risk(self, transaction_data):
         """
         Calculate risk score for a single transaction
         Returns: (risk_score, risk_level, reasons)
         """
-        risk_factors = []
-        risk_score = 0.0
-        
-        # Amount-based risk
-        amount = float(transaction_data.get('amount', 0))
-        if amount > 10000000:  # 10M KES
-            risk_score += 0.4
-            risk_factors.append(f"High amount: {amount:,.0f} KES")
-        elif amount > 1000000:  # 1M KES
-            risk_score += 0.2
-            risk_factors.append(f"Medium amount: {amount:,.0f} KES")
-        
-        # Merchant risk
-        merchant = str(transaction_data.get('merchant_name', '')).lower()
-        high_risk_merchants = ['unknown', 'shell', 'suspicious', 'cash']
-        if any(keyword in merchant for keyword in high_risk_merchants):
-            risk_score += 0.3
-            risk_factors.append(f"High-risk merchant: {merchant}")
-        
-        # Transaction type risk
-        tx_type = str(transaction_data.get('transaction_type', '')).lower()
-        if tx_type in ['transfer', 'payment'] and amount > 5000000:
-            risk_score += 0.2
-            risk_factors.append("Large transfer/payment")
-        
-        # Location risk
-        location = str(transaction_data.get('location', '')).lower()
-        if location in ['unknown', 'offshore', 'foreign']:
-            risk_score += 0.25
-            risk_factors.append(f"High-risk location: {location}")
-        
-        # Channel risk
-        channel = str(transaction_data.get('channel', '')).lower()
-        if channel == 'online' and amount > 2000000:
-            risk_score += 0.15
-            risk_factors.append("Large online transaction")
-        
-        # Time-based risk (transactions outside business hours)
-        timestamp = transaction_data.get('timestamp')
-        if timestamp:
-            hour = pd.to_datetime(timestamp).hour
-            if hour < 6 or hour > 22:  # Outside 6 AM - 10 PM
-                risk_score += 0.1
-                risk_factors.append("Off-hours transaction")
+        risk_scores, reasons = self.calculate_transaction_risks(pd.DataFrame([transaction_data]))
+        risk_score = float(risk_scores[0])
+        if np.isnan(risk_score):
+            raise ValueError(reasons[0])
         
         # Determine risk level
         if risk_score >= 0.8:
@@ -70,7 +53,73 @@ class RiskScorer:
         else:
             risk_level = 'LOW'
         
-        return risk_score, risk_level, '; '.join(risk_factors)
+        return risk_score, risk_level, reasons[0]
+    
+    def calculate_transaction_risks(self, transactions):
+        """
+        Calculate rule-based risk scores for a batch of transactions in one pass
+        Returns: (risk_scores, reasons), aligned with the rows of transactions.
+        Rows whose amount is missing or not numeric score NaN.
+        """
+        def column(name, default=''):
+            if name in transactions.columns:
+                return transactions[name]
+            return pd.Series(default, index=transactions.index)
+        
+        amount = pd.to_numeric(column('amount', 0), errors='coerce').to_numpy(dtype=float)
+        merchant = column('merchant_name').astype(str).str.lower()
+        tx_type = column('transaction_type').astype(str).str.lower()
+        location = column('location').astype(str).str.lower()
+        channel = column('channel').astype(str).str.lower()
+        
+        # Time-based risk (transactions outside business hours, 6 AM - 10 PM);
+        # unparseable or missing timestamps give NaN hours and never match
+        if 'timestamp' in transactions.columns:
+            timestamp = transactions['timestamp']
+            if not pd.api.types.is_datetime64_any_dtype(timestamp):
+                timestamp = pd.to_datetime(timestamp, format='ISO8601', errors='coerce')
+            hour = timestamp.dt.hour.to_numpy(dtype=float)
+            off_hours = (hour < 6) | (hour > 22)
+        else:
+            off_hours = np.zeros(len(transactions), dtype=bool)
+        
+        high_amount = amount > 10000000  # 10M KES
+        medium_amount = (amount > 1000000) & ~high_amount  # 1M KES
+        risky_merchant = merchant.str.contains('|'.join(self.HIGH_RISK_MERCHANT_KEYWORDS)).to_numpy()
+        large_transfer = tx_type.isin(self.LARGE_TRANSFER_TYPES).to_numpy() & (amount > 5000000)
+        risky_location = location.isin(self.HIGH_RISK_LOCATIONS).to_numpy()
+        large_online = (channel == 'online').to_numpy() & (amount > 2000000)
+        merchant = merchant.to_numpy()
+        location = location.to_numpy()
+        
+        # (rows flagged, score added, reason for a flagged row), in the order
+        # the reasons are reported
+        factors = [
+            (high_amount, 0.4, lambda i: f"High amount: {amount[i]:,.0f} KES"),
+            (medium_amount, 0.2, lambda i: f"Medium amount: {amount[i]:,.0f} KES"),
+            (risky_merchant, 0.3, lambda i: f"High-risk merchant: {merchant[i]}"),
+            (large_transfer, 0.2, lambda i: "Large transfer/payment"),
+            (risky_location, 0.25, lambda i: f"High-risk location: {location[i]}"),
+            (large_online, 0.15, lambda i: "Large online transaction"),
+            (off_hours, 0.1, lambda i: "Off-hours transaction"),
+        ]
+        
+        # Scores are whole-array adds; only flagged rows format a reason
+        risk_scores = np.zeros(len(transactions))
+        reasons = np.full(len(transactions), '', dtype=object)
+        for flagged, weight, describe in factors:
+            rows = np.flatnonzero(flagged)
+            risk_scores[rows] += weight
+            text = np.array([describe(i) for i in rows], dtype=object)
+            reasons[rows] = np.where(reasons[rows] == '', text, reasons[rows] + '; ' + text)
+        
+        # An unreadable amount can't be scored; mark just that row invalid so
+        # callers can reject it without failing the rest of the batch
+        invalid = np.isnan(amount)
+        risk_scores[invalid] = np.nan
+        reasons[invalid] = [f"Invalid amount: {value!r}" for value in column('amount', 0)[invalid]]
+        
+        return risk_scores, reasons.tolist()
     
     def train_anomaly_detector(self, historical_data):
         """Train the isolation forest on historical transaction data"""
@@ -82,12 +131,36 @@ class RiskScorer:
             # Prepare features for anomaly detection
             features = self._prepare_features(historical_data)
             
+            # The model is fully determined by its features, its parameters and
+            # the scikit-learn version that fits (and pickles) it: if none of
+            # them changed since the last fit, keep the fitted model
+            fingerprint = joblib.hash(
+                (features, self.isolation_forest.get_params(), sklearn.__version__)
+            )
+            if self.is_trained and fingerprint == self.training_fingerprint:
+                logger.info("Training data unchanged; keeping current anomaly detector")
+                return True
+            
+            cache_path = None
+            if self.model_cache_dir:
+                cache_path = os.path.join(self.model_cache_dir, f"anomaly_detector_{fingerprint}.joblib")
+                if os.path.exists(cache_path):
+                    self.scaler, self.isolation_forest = joblib.load(cache_path)
+                    self.is_trained = True
+                    self.training_fingerprint = fingerprint
+                    logger.info(f"Loaded cached anomaly detector for {len(historical_data)} transactions")
+                    return True
+            
             # Scale features
             features_scaled = self.scaler.fit_transform(features)
             
             # Train isolation forest
             self.isolation_forest.fit(features_scaled)
             self.is_trained = True
+            self.training_fingerprint = fingerprint
+            
+            if cache_path:
+                self._save_cached_model(cache_path)
             
             logger.info(f"Trained anomaly detector on {len(historical_data)} transactions")
             return True
@@ -95,61 +168,110 @@ class RiskScorer:
             logger.error(f"Error training anomaly detector: {e}")
             return False
     
+    def _save_cached_model(self, cache_path):
+        """Save the fitted model to the cache and prune all but the newest entries"""
+        # The model is already trained and in use, so a cache failure only
+        # costs a refit on the next start
+        try:
+            os.makedirs(self.model_cache_dir, exist_ok=True)
+            joblib.dump((self.scaler, self.isolation_forest), cache_path)
+            
+            # Training data changes with every new transaction, so fingerprints
+            # rarely recur: keep only the most recently written models
+            cached = []
+            for name in os.listdir(self.model_cache_dir):
+                if name.startswith('anomaly_detector_') and name.endswith('.joblib'):
+                    path = os.path.join(self.model_cache_dir, name)
+                    try:
+                        cached.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass  # Pruned meanwhile by another engine
+            
+            for _, path in sorted(cached, reverse=True)[self.MODEL_CACHE_KEEP:]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Pruned meanwhile by another engine
+        except Exception as e:
+            logger.warning(f"Could not cache anomaly detector in {self.model_cache_dir}: {e}")
+    
     def detect_anomaly(self, transaction_data):
         """Detect if a transaction is anomalous using the trained model"""
+        risk_contributions, reasons = self.detect_anomalies(pd.DataFrame([transaction_data]))
+        return risk_contributions[0], reasons[0]
+    
+    def detect_anomalies(self, transactions):
+        """
+        Score a batch of transactions with the trained model in one pass
+        Returns: (risk_contributions, reasons), aligned with the rows of transactions
+        """
         if not self.is_trained:
-            return 0.0, "Model not trained"
+            return np.zeros(len(transactions)), ["Model not trained"] * len(transactions)
         
         try:
-            # Prepare features
-            features = self._prepare_features(pd.DataFrame([transaction_data]))
+            # Prepare features for the whole batch at once
+            features = self._prepare_features(transactions)
             features_scaled = self.scaler.transform(features)
             
-            # Get anomaly score
-            anomaly_score = self.isolation_forest.decision_function(features_scaled)[0]
-            is_anomaly = self.isolation_forest.predict(features_scaled)[0] == -1
+            # Get anomaly scores; predict() is decision_function() < 0, so reuse
+            # them instead of walking every tree a second time
+            anomaly_scores = self.isolation_forest.decision_function(features_scaled)
+            is_anomaly = anomaly_scores < 0
             
             # Convert to risk score (anomaly_score is negative for anomalies)
-            risk_contribution = max(0, -anomaly_score * 0.3)  # Scale to 0-0.3 range
+            risk_contributions = np.maximum(0, -anomaly_scores * 0.3)  # Scale to 0-0.3 range
             
-            reason = "Anomalous pattern detected" if is_anomaly else "Normal pattern"
-            return risk_contribution, reason
+            reasons = np.where(is_anomaly, "Anomalous pattern detected", "Normal pattern").tolist()
+            return risk_contributions, reasons
         except Exception as e:
             logger.error(f"Error in anomaly detection: {e}")
-            return 0.0, "Anomaly detection failed"
+            return np.zeros(len(transactions)), ["Anomaly detection failed"] * len(transactions)
     
     def _prepare_features(self, data):
-        """Prepare numerical features for machine learning"""
+        """Prepare numerical features for machine learning as a float32 array"""
         features = pd.DataFrame()
         
         # Amount (log-transformed to handle large values)
-        features['log_amount'] = np.log1p(data['amount'].astype(float))
+        # Unreadable amounts become NaN (zeroed by fillna below) rather than
+        # failing the whole batch
+        features['log_amount'] = np.log1p(pd.to_numeric(data['amount'], errors='coerce'))
         
-        # Hour of day
+        # Hour of day and day of week, parsing the timestamps at most once
         if 'timestamp' in data.columns:
-            features['hour'] = pd.to_datetime(data['timestamp']).dt.hour
+            timestamp = data['timestamp']
+            if not pd.api.types.is_datetime64_any_dtype(timestamp):
+                # Malformed values become NaT; fillna below zeroes their features
+                timestamp = pd.to_datetime(timestamp, format='ISO8601', errors='coerce')
+            features['hour'] = timestamp.dt.hour
+            features['day_of_week'] = timestamp.dt.dayofweek
         else:
             features['hour'] = 12  # Default to noon
-        
-        # Day of week
-        if 'timestamp' in data.columns:
-            features['day_of_week'] = pd.to_datetime(data['timestamp']).dt.dayofweek
-        else:
             features['day_of_week'] = 1  # Default to Tuesday
         
         # Transaction type encoding
-        tx_type_map = {'transfer': 1, 'payment': 2, 'withdrawal': 3, 'deposit': 4}
-        features['tx_type_encoded'] = data.get('transaction_type', 'transfer').map(
-            lambda x: tx_type_map.get(str(x).lower(), 0)
+        features['tx_type_encoded'] = self._encode_categorical(
+            data.get('transaction_type', pd.Series('transfer', index=data.index)), self.TX_TYPE_CODES
         )
         
         # Channel encoding
-        channel_map = {'mobile': 1, 'online': 2, 'atm': 3, 'branch': 4}
-        features['channel_encoded'] = data.get('channel', 'mobile').map(
-            lambda x: channel_map.get(str(x).lower(), 0)
+        features['channel_encoded'] = self._encode_categorical(
+            data.get('channel', pd.Series('mobile', index=data.index)), self.CHANNEL_CODES
         )
         
-        return features.fillna(0)
+        # IsolationForest works in float32 internally; handing it (and the
+        # scaler, which preserves the dtype) float32 avoids a float64 copy
+        return features.fillna(0).to_numpy(dtype=np.float32)
+
+    @staticmethod
+    def _encode_categorical(values, mapping):
+        """Encode a string column through its categories instead of row by row"""
+        categorical = values.astype('category')
+        # Only the distinct values are lowercased and looked up; the trailing 0
+        # is picked by code -1 (missing values)
+        lookup = np.array(
+            [mapping.get(str(category).lower(), 0) for category in categorical.cat.categories] + [0]
+        )
+        return lookup[categorical.cat.codes.to_numpy()]
 
 class CreditRiskModel:
     """Specialized model for credit risk assessment"""
@@ -159,13 +281,13 @@ class CreditRiskModel:
         risk_score = 0.0
         factors = []
         
-        if len(transaction_history) == 0:
+        if transaction_history.empty:
             return 0.5, "No transaction history available"
         
-        # Calculate transaction velocity
-        daily_volume = transaction_history.groupby(
-            transaction_history['timestamp'].dt.date
-        )['amount'].sum()
+        # Calculate transaction velocity. Truncating to datetime64[D] keeps the
+        # day keys as int64 instead of materialising a Python date per row.
+        days = transaction_history['timestamp'].to_numpy(dtype='datetime64[D]')
+        daily_volume = transaction_history['amount'].groupby(days, sort=False).sum()
         
         avg_daily_volume = daily_volume.mean()
         max_daily_volume = daily_volume.max()
@@ -174,9 +296,9 @@ class CreditRiskModel:
             risk_score += 0.3
             factors.append("High transaction velocity detected")
         
-        # Large transaction frequency
-        large_txns = transaction_history[transaction_history['amount'] > 1000000]
-        if len(large_txns) > len(transaction_history) * 0.1:
+        # Large transaction frequency (count the mask, don't build the subset)
+        large_txn_count = (transaction_history['amount'] > 1000000).sum()
+        if large_txn_count > len(transaction_history) * 0.1:
             risk_score += 0.2
             factors.append("Frequent large transactions")
         
@@ -3,9 +3,9 @@
 Generate sample transaction data for testing the risk management system
 """
 
-import random
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import sys
 import os
 
@@ -14,12 +14,18 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'risk_engine'))
 from database import DatabaseManager
 
 class SampleDataGenerator:
-    def __init__(self):
+    def __init__(self, seed=None):
         self.db = DatabaseManager()
+        # A seed fixes the sequence of draws, so runs repeat only with the same
+        # batch/chunk sizes, and timestamps are still offsets from now
+        self.rng = np.random.default_rng(seed)
         
-        # Sample data pools
-        self.customers = [f"CUST_{i:05d}" for i in range(1000, 2000)]
-        self.accounts = [f"{random.randint(1000000000, 9999999999)}" for _ in range(len(self.customers))]
+        # Sample data pools, drawn as whole arrays rather than row by row
+        customer_numbers = np.arange(1000, 2000).astype(str)
+        self.customers = np.char.add("CUST_", np.char.zfill(customer_numbers, 5))
+        self.accounts = self.rng.integers(
+            1000000000, 9999999999, size=len(self.customers), endpoint=True
+        ).astype(str)
         
         self.merchants = [
             "Safaricom Ltd", "Equity Bank", "KCB Bank", "Cooperative Bank",
@@ -51,107 +57,134 @@ class SampleDataGenerator:
             "UNKNOWN", "HIGH_RISK", "SOFTWARE"
         ]
     
-    def generate_normal_transaction(self):
-        """Generate a normal, low-risk transaction"""
-        customer_id = random.choice(self.customers)
-        account_number = random.choice(self.accounts)
+    def generate_normal_transactions(self, count):
+        """Generate normal, low-risk transactions as a dict of column arrays"""
+        # Normal transaction amounts (mostly under 1M KES): pick a size bucket
+        # per row, then make a single uniform draw within its bounds
+        bucket = self.rng.integers(0, 3, size=count)
+        amount = self.rng.uniform(
+            np.array([100, 50000, 500000])[bucket],     # small / medium / large but normal
+            np.array([50000, 500000, 1000000])[bucket]
+        )
         
-        # Normal transaction amounts (mostly under 1M KES)
-        amount = random.choice([
-            random.uniform(100, 50000),      # 70% - small transactions
-            random.uniform(50000, 500000),   # 25% - medium transactions  
-            random.uniform(500000, 1000000)  # 5% - large but normal
-        ])
+        # One index draw gathers both the customer and their account
+        customer_idx = self.rng.integers(0, len(self.customers), size=count)
         
-        merchant = random.choice(self.merchants[:20])  # Avoid high-risk merchants
-        location = random.choice(self.locations[:15])  # Avoid high-risk locations
+        # Last 7 days, as a single vector of minute offsets from now
+        now = np.datetime64(datetime.now(), 'us')
+        minutes_ago = self.rng.integers(0, 169, size=count) * 60 + self.rng.integers(0, 60, size=count)
+        timestamp = now - minutes_ago.astype('timedelta64[m]')
         
         return {
-            'transaction_id': f"TXN_{random.randint(100000, 999999)}",
-            'customer_id': customer_id,
-            'account_number': account_number,
-            'amount': round(amount, 2),
-            'currency': 'KES',
-            'transaction_type': random.choice(self.transaction_types),
-            'merchant_name': merchant,
-            'merchant_category': random.choice(self.merchant_categories[:10]),
-            'location': location,
-            'channel': random.choice(self.channels),
-            'timestamp': datetime.now() - timedelta(
-                hours=random.randint(0, 168),  # Last 7 days
-                minutes=random.randint(0, 59)
+            'transaction_id': np.char.add(
+                "TXN_", self.rng.integers(100000, 999999, size=count, endpoint=True).astype(str)
             ),
-            'status': 'PENDING'
+            'customer_id': self.customers[customer_idx],
+            'account_number': self.accounts[customer_idx],
+            'amount': amount,
+            # Label columns hold integer indices into the vocabulary lists and
+            # become categoricals in generate_batch
+            'currency': np.zeros(count, dtype=np.int8),
+            'transaction_type': self._codes(0, len(self.transaction_types), count),
+            'merchant_name': self._codes(0, 20, count),  # Avoid high-risk merchants
+            'merchant_category': self._codes(0, 10, count),
+            'location': self._codes(0, 15, count),  # Avoid high-risk locations
+            'channel': self._codes(0, len(self.channels), count),
+            'timestamp': timestamp,
+            'status': np.zeros(count, dtype=np.int8)
         }
     
-    def generate_medium_risk_transaction(self):
-        """Generate a medium-risk transaction"""
-        transaction = self.generate_normal_transaction()
-        
-        # Make it medium risk by adjusting parameters
-        risk_factors = random.choice([
-            'high_amount',
-            'suspicious_merchant',
-            'off_hours',
-            'high_velocity'
-        ])
-        
-        if risk_factors == 'high_amount':
-            transaction['amount'] = random.uniform(1000000, 5000000)  # 1-5M KES
-        elif risk_factors == 'suspicious_merchant':
-            transaction['merchant_name'] = random.choice(self.merchants[-6:])  # High-risk merchants
-            transaction['merchant_category'] = 'HIGH_RISK'
-        elif risk_factors == 'off_hours':
-            # Set to off-hours (late night/early morning)
-            transaction['timestamp'] = transaction['timestamp'].replace(
-                hour=random.choice([1, 2, 3, 4, 5, 23])
-            )
-        elif risk_factors == 'high_velocity':
-            transaction['amount'] = random.uniform(800000, 1500000)
-            transaction['channel'] = 'ONLINE'
-        
-        return transaction
+    def _codes(self, low, high, count):
+        """Draw count vocabulary indices in [low, high)"""
+        return self.rng.integers(low, high, size=count, dtype=np.int8)
+    
+    def _flags(self, count, probability):
+        """Draw count booleans that are True with the given probability"""
+        # Compare raw 64-bit output against a threshold instead of converting
+        # every draw to a float in [0, 1)
+        threshold = np.uint64(probability * 2.0**64)
+        return self.rng.bit_generator.random_raw(count) < threshold
     
-    def generate_high_risk_transaction(self):
-        """Generate a high-risk transaction"""
-        transaction = self.generate_normal_transaction()
+    def _set_hour(self, transactions, mask, hours):
+        """Move the masked timestamps to one of the given hours of the same day"""
+        timestamp = transactions['timestamp'][mask]
+        hour = (timestamp - timestamp.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+        new_hour = self.rng.choice(hours, size=len(timestamp))
+        transactions['timestamp'][mask] = timestamp + (new_hour - hour).astype('timedelta64[h]')
+    
+    def _apply_medium_risk(self, transactions, mask):
+        """Turn the masked rows into medium-risk transactions"""
+        # Make it medium risk by adjusting one parameter per row:
+        # 0 high_amount, 1 suspicious_merchant, 2 off_hours, 3 high_velocity
+        risk_factors = np.full(len(mask), -1, dtype=np.int8)
+        risk_factors[mask] = self._codes(0, 4, mask.sum())
+        
+        rows = risk_factors == 0  # high_amount
+        transactions['amount'][rows] = self.rng.uniform(1000000, 5000000, rows.sum())  # 1-5M KES
+        
+        rows = risk_factors == 1  # suspicious_merchant
+        transactions['merchant_name'][rows] = self._codes(len(self.merchants) - 6, len(self.merchants), rows.sum())  # High-risk merchants
+        transactions['merchant_category'][rows] = self.merchant_categories.index('HIGH_RISK')
         
+        # Set to off-hours (late night/early morning)
+        self._set_hour(transactions, risk_factors == 2, [1, 2, 3, 4, 5, 23])
+        
+        rows = risk_factors == 3  # high_velocity
+        transactions['amount'][rows] = self.rng.uniform(800000, 1500000, rows.sum())
+        transactions['channel'][rows] = self.channels.index('ONLINE')
+    
+    def _apply_high_risk(self, transactions, mask):
+        """Turn the masked rows into high-risk transactions"""
         # Make it high risk with multiple factors
-        transaction['amount'] = random.uniform(5000000, 50000000)  # 5-50M KES
-        transaction['merchant_name'] = random.choice(self.merchants[-6:])  # High-risk merchants
-        transaction['merchant_category'] = 'HIGH_RISK'
-        transaction['location'] = random.choice(self.locations[-3:])  # High-risk locations
-        transaction['channel'] = 'ONLINE'
+        count = mask.sum()
+        transactions['amount'][mask] = self.rng.uniform(5000000, 50000000, count)  # 5-50M KES
+        transactions['merchant_name'][mask] = self._codes(len(self.merchants) - 6, len(self.merchants), count)  # High-risk merchants
+        transactions['merchant_category'][mask] = self.merchant_categories.index('HIGH_RISK')
+        transactions['location'][mask] = self._codes(len(self.locations) - 3, len(self.locations), count)  # High-risk locations
+        transactions['channel'][mask] = self.channels.index('ONLINE')
         
         # Often off-hours
-        if random.random() < 0.7:
-            transaction['timestamp'] = transaction['timestamp'].replace(
-                hour=random.choice([1, 2, 3, 4, 23])
-            )
-        
-        return transaction
+        off_hours = mask.copy()
+        off_hours[mask] = self._flags(count, 0.7)
+        self._set_hour(transactions, off_hours, [1, 2, 3, 4, 23])
     
     def generate_batch(self, count=100):
-        """Generate a batch of mixed transactions"""
-        transactions = []
-        
-        for _ in range(count):
-            risk_type = random.choices(
-                ['normal', 'medium', 'high'],
-                weights=[0.85, 0.12, 0.03],  # 85% normal, 12% medium, 3% high
-                k=1
-            )[0]
-            
-            if risk_type == 'normal':
-                transaction = self.generate_normal_transaction()
-            elif risk_type == 'medium':
-                transaction = self.generate_medium_risk_transaction()
-            else:
-                transaction = self.generate_high_risk_transaction()
-            
-            transactions.append(transaction)
+        """Generate a batch of mixed transactions as a DataFrame"""
+        # Draw every column for the whole batch at once, then overlay the
+        # risk adjustments on the rows that drew a medium or high profile.
+        # The profile is one weighted draw of codes 0 normal, 1 medium, 2 high
+        risk_type = self.rng.choice(
+            3,
+            size=count,
+            p=[0.85, 0.12, 0.03]  # 85% normal, 12% medium, 3% high
+        )
+        
+        transactions = self.generate_normal_transactions(count)
+        self._apply_medium_risk(transactions, risk_type == 1)
+        self._apply_high_risk(transactions, risk_type == 2)
+        
+        # Round every amount to cents in one pass, after the overlays have
+        # replaced some of them
+        np.round(transactions['amount'], 2, out=transactions['amount'])
+        
+        # Labels from small fixed vocabularies are stored as categoricals:
+        # the drawn indices are used as the codes directly, so no per-row
+        # Python str is ever created
+        vocabularies = {
+            'currency': ['KES'],
+            'transaction_type': self.transaction_types,
+            'merchant_name': self.merchants,
+            'merchant_category': self.merchant_categories,
+            'location': self.locations,
+            'channel': self.channels,
+            'status': ['PENDING']
+        }
+        for column, categories in vocabularies.items():
+            transactions[column] = pd.Categorical.from_codes(transactions[column], categories=categories)
         
-        return transactions
+        # Wrap the column arrays as they are instead of inferring dtypes from
+        # a list of row dicts
+        return pd.DataFrame(transactions, copy=False)
     
     def insert_transactions(self, transactions):
         """Insert transactions into the database"""
@@ -159,19 +192,23 @@ class SampleDataGenerator:
         try:
             cur = conn.cursor()
             
-            for txn in transactions:
-                cur.execute("""
-                    INSERT OR IGNORE INTO transaction_history 
-                    (transaction_id, customer_id, account_number, amount, currency,
-                     transaction_type, merchant_name, merchant_category, location, 
-                     channel, timestamp, status)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    txn['transaction_id'], txn['customer_id'], txn['account_number'],
-                    txn['amount'], txn['currency'], txn['transaction_type'],
-                    txn['merchant_name'], txn['merchant_category'], txn['location'],
-                    txn['channel'], txn['timestamp'], txn['status']
-                ))
+            # Bind the whole batch in one executemany call. Timestamps are
+            # formatted as the text sqlite3's datetime adapter writes.
+            rows = transactions.assign(
+                timestamp=transactions['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+            )[[
+                'transaction_id', 'customer_id', 'account_number', 'amount', 'currency',
+                'transaction_type', 'merchant_name', 'merchant_category', 'location',
+                'channel', 'timestamp', 'status'
+            ]].itertuples(index=False, name=None)
+            
+            cur.executemany("""
+                INSERT OR IGNORE INTO transaction_history 
+                (transaction_id, customer_id, account_number, amount, currency,
+                 transaction_type, merchant_name, merchant_category, location, 
+                 channel, timestamp, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
             
             conn.commit()
             print(f"✅ Inserted {len(transactions)} transactions")
@@ -182,27 +219,34 @@ class SampleDataGenerator:
         finally:
             conn.close()
     
-    def generate_and_insert(self, count=100):
-        """Generate and insert sample transactions"""
+    def generate_and_insert(self, count=100, chunk_size=50000):
+        """Generate and insert sample transactions, chunk_size rows at a time"""
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+        
         print(f"🔄 Generating {count} sample transactions...")
-        transactions = self.generate_batch(count)
-        self.insert_transactions(transactions)
+        risk_summary = pd.Series(dtype='int64')
         
-        # Print summary
-        risk_summary = {}
-        for txn in transactions:
-            amount = txn['amount']
-            if amount >= 5000000:
-                risk_level = 'HIGH'
-            elif amount >= 1000000 or txn['merchant_category'] == 'HIGH_RISK':
-                risk_level = 'MEDIUM'
-            else:
-                risk_level = 'LOW'
+        # Large runs are generated and inserted in bounded chunks so memory
+        # stays flat regardless of --count
+        for start in range(0, count, chunk_size):
+            transactions = self.generate_batch(min(chunk_size, count - start))
+            self.insert_transactions(transactions)
             
-            risk_summary[risk_level] = risk_summary.get(risk_level, 0) + 1
+            amount = transactions['amount']
+            risk_level = np.select(
+                [
+                    amount >= 5000000,
+                    (amount >= 1000000) | (transactions['merchant_category'] == 'HIGH_RISK')
+                ],
+                ['HIGH', 'MEDIUM'],
+                default='LOW'
+            )
+            risk_summary = risk_summary.add(pd.Series(risk_level).value_counts(), fill_value=0)
         
+        # Print summary
         print(f"📊 Generated transactions by risk level:")
-        for level, count in risk_summary.items():
+        for level, count in risk_summary.sort_values(ascending=False).astype(int).items():
             print(f"   {level}: {count}")
 
 def main():
@@ -213,10 +257,16 @@ def main():
     parser.add_argument('--count', type=int, default=100, help='Number of transactions to generate')
     parser.add_argument('--continuous', action='store_true', help='Generate transactions continuously')
     parser.add_argument('--interval', type=int, default=30, help='Interval in seconds for continuous mode')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed: repeats the same draws for the same --count and '
+                             '--chunk-size (timestamps stay relative to the current time)')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows generated and inserted per chunk')
     
     args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
     
-    generator = SampleDataGenerator()
+    generator = SampleDataGenerator(seed=args.seed)
     
     if args.continuous:
         print(f"🔄 Starting continuous generation (every {args.interval} seconds)")
@@ -230,7 +280,7 @@ def main():
         except KeyboardInterrupt:
             print("\n⏹️ Stopped by user")
     else:
-        generator.generate_and_insert(args.count)
+        generator.generate_and_insert(args.count, chunk_size=args.chunk_size)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -76,7 +76,7 @@ class SystemTester:
         print("🔍 Testing sample data...")
         try:
             transactions = self.db.fetch_pending_transactions(limit=5)
-            if len(transactions) > 0:
+            if not transactions.empty:
                 print(f"✅ Found {len(transactions)} sample transactions")
                 return True
             else: